@@ -1,175 +1,46 @@
 import os
 import sys
-import subprocess
-import math
 from datetime import datetime, timedelta
-import pytz
-from PIL import Image, ImageDraw, ImageFont
+from location import SF_TZ
+from sunutils import get_sun_events
+from timelineutils import GlobalTimeline
+from renderutils import encode_concat, encode_frames
 
-# San Francisco Coordinates
-LATITUDE = 37.791667734079596
-LONGITUDE = -122.41549323195979
-SF_TZ = pytz.timezone("America/Los_Angeles")
-
-def get_sun_events(date):
-    """Calculates solar events for SF using Solar Position algorithm."""
-    day_of_year = date.timetuple().tm_yday
-    gamma = (2 * math.pi / 365.0) * (day_of_year - 1)
-    
-    eqtime = 229.18 * (0.000075 + 0.001868 * math.cos(gamma) - 0.032077 * math.sin(gamma) \
-             - 0.014615 * math.cos(2 * gamma) - 0.040849 * math.sin(2 * gamma))
-    
-    decl = 0.006918 - 0.399912 * math.cos(gamma) + 0.070257 * math.sin(gamma) \
-           - 0.006758 * math.cos(2 * gamma) + 0.000907 * math.sin(2 * gamma) \
-           - 0.002697 * math.cos(3 * gamma) + 0.00148 * math.sin(3 * gamma)
-    
-    rad_lat = math.radians(LATITUDE)
-    
-    def time_for_zenith(z_deg):
-        zenith = math.radians(z_deg)
-        cos_ha = (math.cos(zenith) / (math.cos(rad_lat) * math.cos(decl))) - (math.tan(rad_lat) * math.tan(decl))
-        if cos_ha > 1 or cos_ha < -1: return None, None
-        ha_deg = math.degrees(math.acos(cos_ha))
-        solar_noon_utc = 720 - (4 * LONGITUDE) - eqtime
-        t1, t2 = solar_noon_utc - (4 * ha_deg), solar_noon_utc + (4 * ha_deg)
-        
-        # Convert to local time
-        res = []
-        for utctime in [min(t1, t2), max(t1, t2)]:
-            dt_utc = datetime(date.year, date.month, date.day, tzinfo=pytz.UTC) + timedelta(minutes=utctime)
-            res.append(dt_utc.astimezone(SF_TZ))
-        return res # morning, evening
-    
-    sunrise_set = time_for_zenith(90.833)
-    civil_dawn_dusk = time_for_zenith(96.0)
-    
-    return {
-        "sunrise": sunrise_set[0],
-        "sunset": sunrise_set[1],
-        "civil_dawn": civil_dawn_dusk[0],
-        "civil_dusk": civil_dawn_dusk[1]
-    }
-
-def get_exif_timestamp(filepath):
-    cmd = ["exiftool", "-DateTimeOriginal", "-CreateDate", "-d", "%Y-%m-%d %H:%M:%S", "-s3", filepath]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode == 0 and result.stdout.strip():
-        return datetime.strptime(result.stdout.strip().split('\n')[0], "%Y-%m-%d %H:%M:%S").replace(tzinfo=SF_TZ)
-    return None
-
-class GlobalTimeline:
-    def __init__(self, root_dir, start_cutoff=None):
-        self.frames = [] # list of (timestamp, absolute_path)
-        print("Indexing drive... this may take a minute.")
-        for root, dirs, files in os.walk(root_dir):
-            if "thumbnail" in root: continue
-            tls_files = sorted([f for f in files if f.startswith("TLS_") and f.endswith(".jpg")])
-            if not tls_files: continue
-            
-            t0 = get_exif_timestamp(os.path.join(root, tls_files[0]))
-            if not t0: continue
-            if start_cutoff and t0 < start_cutoff: continue
-            
-            tn = get_exif_timestamp(os.path.join(root, tls_files[-1]))
-            if not tn: continue
-            
-            # Handle variable capture rate by interpolating between t0 and tn
-            count = len(tls_files)
-            if count > 1:
-                total_delta = (tn - t0).total_seconds()
-                interval = total_delta / (count - 1)
-            else:
-                interval = 10 # fallback
-                
-            for i, f in enumerate(tls_files):
-                ts = t0 + timedelta(seconds=i * interval)
-                self.frames.append((ts, os.path.join(root, f)))
-        
-        self.frames.sort(key=lambda x: x[0])
-        print(f"Indexed {len(self.frames)} frames.")
-
-    def get_range(self, target_time, duration_sec=60, center_ratio=0.5):
-        num_frames = duration_sec * 30 # 30 fps
-        frames_before = int(num_frames * center_ratio)
-        
-        import bisect
-        # Search for first frame >= (target_time - some buffer)
-        idx = bisect.bisect_left([f[0] for f in self.frames], target_time)
-        
-        start_idx = max(0, idx - frames_before)
-        end_idx = start_idx + num_frames
-        
-        if end_idx > len(self.frames):
-            end_idx = len(self.frames)
-            start_idx = max(0, end_idx - num_frames)
-            
-        return self.frames[start_idx:end_idx]
-
-def create_video_with_timestamps(frame_list, output_path):
-    tmp_dir = "tmp_processing"
-    if os.path.exists(tmp_dir): subprocess.run(["rm", "-rf", tmp_dir])
-    os.makedirs(tmp_dir)
+def create_video_with_timestamps(frame_list, output_path, timestamps=True, ffmpeg_overlay=False):
+    if not timestamps or ffmpeg_overlay:
+        print(f"Encoding {len(frame_list)} frames {'with ffmpeg timestamps' if timestamps else 'without timestamps'}...")
+        encode_concat(frame_list, output_path, "tmp_processing", burn_in=timestamps)
+        return
     
     print(f"Processing {len(frame_list)} frames with PIL timestamps...")
-    # Attempt to find a font
-    font = None
-    font_paths = ["/Library/Fonts/Arial.ttf", "/System/Library/Fonts/Helvetica.ttc", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"]
-    for p in font_paths:
-        if os.path.exists(p):
-            try:
-                font = ImageFont.truetype(p, 40)
-                break
-            except: continue
-            
-    for i, (ts, path) in enumerate(frame_list):
-        img = Image.open(path)
-        
-        # Smart Orientation: If the image is landscape, rotate it to vertical.
-        if img.width > img.height:
-            img = img.transpose(Image.ROTATE_270)
-        
-        draw = ImageDraw.Draw(img)
-        ts_str = ts.strftime("%Y-%m-%d %H:%M:%S")
-        
-        # Subtle font: semi-transparent gray in bottom right
-        if font:
-            draw.text((img.width - 450, img.height - 80), ts_str, font=font, fill=(200, 200, 200, 150))
-        else:
-            draw.text((img.width - 450, img.height - 80), ts_str, fill=(200, 200, 200))
-            
-        img.save(os.path.join(tmp_dir, f"frame_{i+1:09d}.jpg"), quality=90)
-    
-    print(f"Encoding video...")
-    cmd = [
-        "ffmpeg", "-loglevel", "quiet", "-y",
-        "-framerate", "30",
-        "-i", os.path.join(tmp_dir, "frame_%09d.jpg"),
-        "-c:v", "libx264", "-crf", "18", "-pix_fmt", "yuv420p",
-        output_path
-    ]
-    subprocess.run(cmd)
-    subprocess.run(["rm", "-rf", tmp_dir])
+    print("Encoding video...")
+    encode_frames(frame_list, output_path)
 
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: python automate_v2.py <root_dir> [output_dir]")
+    args = [a for a in sys.argv[1:] if a not in ("--no-timestamp", "--ffmpeg-overlay")]
+    timestamps = "--no-timestamp" not in sys.argv
+    # Draw timestamps with ffmpeg (needs libass) instead of PIL
+    ffmpeg_overlay = "--ffmpeg-overlay" in sys.argv
+    if not args:
+        print("Usage: python automate_v2.py <root_dir> [output_dir] [--no-timestamp | --ffmpeg-overlay]")
         sys.exit(1)
         
-    root = sys.argv[1]
-    out = sys.argv[2] if len(sys.argv) > 2 else "./output_v2"
+    root = args[0]
+    out = args[1] if len(args) > 1 else "./output_v2"
     if not os.path.exists(out): os.makedirs(out)
     
     # Process all frames from September 23, 2025 onwards
-    CUTOFF = SF_TZ.localize(datetime(2025, 9, 23))
+    CUTOFF = datetime(2025, 9, 23, tzinfo=SF_TZ)
+    print("Indexing drive... this may take a minute.")
     timeline = GlobalTimeline(root, start_cutoff=CUTOFF)
     
     # Process the full timeline range
-    if not timeline.frames:
+    if not timeline:
         print("No frames found.")
         sys.exit(0)
         
-    start_date = timeline.frames[0][0].date()
-    end_date = timeline.frames[-1][0].date()
+    first, last = timeline.span()
+    start_date, end_date = first.date(), last.date()
     
     curr = start_date
     while curr <= end_date:
@@ -181,7 +52,7 @@ if __name__ == "__main__":
             if frames:
                 out_name = os.path.join(out, f"{curr.strftime('%Y-%m-%d')}_sunrise.mp4")
                 if not os.path.exists(out_name):
-                    create_video_with_timestamps(frames, out_name)
+                    create_video_with_timestamps(frames, out_name, timestamps, ffmpeg_overlay)
                     print(f"Created: {out_name}")
                 else:
                     print(f"Skip: {out_name}")
@@ -192,7 +63,7 @@ if __name__ == "__main__":
             if frames:
                 out_name = os.path.join(out, f"{curr.strftime('%Y-%m-%d')}_sunset.mp4")
                 if not os.path.exists(out_name):
-                    create_video_with_timestamps(frames, out_name)
+                    create_video_with_timestamps(frames, out_name, timestamps, ffmpeg_overlay)
                     print(f"Created: {out_name}")
                 else:
                     print(f"Skip: {out_name}")
@@ -2,102 +2,15 @@ import os
 import sys
 import subprocess
 from datetime import datetime, timedelta
+from sunutils import get_sun_time
+from exifutils import ExifDaemon
 
-import math
-
-# Coordinates provided by user
-LATITUDE = 37.791667734079596
-LONGITUDE = -122.41549323195979
-
-def get_sun_time(date, event="sunrise"):
-    """
-    Calculates sunrise or sunset for a given date using the 
-    General Solar Position algorithm.
-    """
-    # Latitude and longitude in degrees
-    lat = LATITUDE
-    lng = LONGITUDE
-    
-    # Day of year
-    day_of_year = date.timetuple().tm_yday
-    
-    # 1. first calculate the fractional year
-    gamma = (2 * math.pi / 365.0) * (day_of_year - 1 + (12.0 - 12.0) / 24.0)
-    
-    # 2. estimate equation of time and solar declination
-    eqtime = 229.18 * (0.000075 + 0.001868 * math.cos(gamma) - 0.032077 * math.sin(gamma) \
-             - 0.014615 * math.cos(2 * gamma) - 0.040849 * math.sin(2 * gamma))
-    
-    decl = 0.006918 - 0.399912 * math.cos(gamma) + 0.070257 * math.sin(gamma) \
-           - 0.006758 * math.cos(2 * gamma) + 0.000907 * math.sin(2 * gamma) \
-           - 0.002697 * math.cos(3 * gamma) + 0.00148 * math.sin(3 * gamma)
-    
-    # 3. calculate the hour angle
-    # Zenith for sunrise/sunset is usually 90.833 degrees
-    zenith = math.radians(90.833)
-    rad_lat = math.radians(lat)
-    
-    # check for atmospheric refraction 
-    cos_ha = (math.cos(zenith) / (math.cos(rad_lat) * math.cos(decl))) - (math.tan(rad_lat) * math.tan(decl))
-    
-    if cos_ha > 1: # Always night
-        return None
-    if cos_ha < -1: # Always day
-        return None
-        
-    ha = math.acos(cos_ha)
-    if event == "sunrise":
-        ha = -ha
-    
-    # 4. calculate UTC time in minutes
-    # Assuming GMT-8 for San Francisco (standard time)
-    # We'll calculate UTC and then adjust to date's local offset
-    ha_deg = math.degrees(ha)
-    
-    # solar_noon_utc = 720 - (4 * longitude) - eqtime
-    solar_noon_utc = 720 - (4 * lng) - eqtime
-    
-    # Calculate both times and sort them to be absolutely sure
-    t1 = solar_noon_utc - (4 * ha_deg)
-    t2 = solar_noon_utc + (4 * ha_deg)
-    
-    morning_utc, evening_utc = min(t1, t2), max(t1, t2)
-    utctime = morning_utc if event == "sunrise" else evening_utc
-    
-    # Basic PST offset (GMT-8)
-    local_time_min = utctime - (8 * 60) 
-    
-    # Handle day wrap-around
-    local_time_min = local_time_min % 1440
-    
-    l_hours = int(local_time_min // 60)
-    l_minutes = int(local_time_min % 60)
-    
-    return datetime(date.year, date.month, date.day, l_hours, l_minutes)
-
-def get_exif_timestamp(filepath):
-    """Uses exiftool to get the DateTimeOriginal or CreateDate."""
-    cmd = ["exiftool", "-DateTimeOriginal", "-CreateDate", "-d", "%Y-%m-%d %H:%M:%S", "-s3", filepath]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode == 0 and result.stdout.strip():
-        # Get the first line of output
-        return datetime.strptime(result.stdout.strip().split('\n')[0], "%Y-%m-%d %H:%M:%S")
-    return None
-
-def find_frames_for_event(folder, target_time, duration_seconds=60, fps=30, interval_seconds=10, center_ratio=0.5):
+def find_frames_for_event(t0, target_time, duration_seconds=60, fps=30, interval_seconds=10, center_ratio=0.5):
     """
     Finds frame range for an event.
+    t0: timestamp of the folder's first frame (TLS_000000001.jpg), already read by the caller.
     center_ratio: 0.5 means event is in middle. 0.2 means event is 20% into the clip.
     """
-    first_frame_path = os.path.join(folder, "TLS_000000001.jpg")
-    if not os.path.exists(first_frame_path):
-        return None, None
-    
-    t0 = get_exif_timestamp(first_frame_path)
-    if not t0:
-        print(f"Warning: Could not get EXIF from {first_frame_path}, using file mtime.")
-        t0 = datetime.fromtimestamp(os.path.getmtime(first_frame_path))
-    
     # How many frames is the target?
     target_offset_seconds = (target_time - t0).total_seconds()
     target_frame = int(target_offset_seconds / interval_seconds) + 1
@@ -113,7 +26,7 @@ def find_frames_for_event(folder, target_time, duration_seconds=60, fps=30, inte
     
     return start_frame, end_frame
 
-def process_folder(folder, output_dir):
+def process_folder(folder, output_dir, exif):
     """Detects sunrise/sunset in a folder and creates videos."""
     # Check first and last frame to see the time range
     first_frame = os.path.join(folder, "TLS_000000001.jpg")
@@ -127,9 +40,9 @@ def process_folder(folder, output_dir):
         
     if not all_files: return
     last_frame_file = all_files[-1]
+    frame_count = len(all_files)
     
-    t_start = get_exif_timestamp(first_frame)
-    t_end = get_exif_timestamp(os.path.join(folder, last_frame_file))
+    t_start, t_end = exif.query([first_frame, os.path.join(folder, last_frame_file)])
     
     if not t_start or not t_end:
         print(f"Warning: Could not get timestamps for {folder}")
@@ -148,17 +61,19 @@ def process_folder(folder, output_dir):
             
             if sun_time is None:
                 continue
+            # EXIF times are the camera's naive wall clock
+            sun_time = sun_time.replace(tzinfo=None)
 
             # buffer of 2 hours for range check to be safe
             if t_start - timedelta(hours=2) <= sun_time <= t_end + timedelta(hours=2):
                 # Request: sunrise relatively early but shifted 15s back from 0.2 (0.2 + 15/60 = 0.45)
                 # sunset stays centered (~50% in)
                 ratio = 0.45 if event == "sunrise" else 0.5
-                s, e = find_frames_for_event(folder, sun_time, center_ratio=ratio)
+                s, e = find_frames_for_event(t_start, sun_time, center_ratio=ratio)
                 
                 if s is not None and e is not None:
                     # Check if frames exist in the folder's range
-                    if s < len(all_files) and e > 1:
+                    if s < frame_count and e > 1:
                         date_str = current_date.strftime("%Y-%m-%d")
                         output_name = f"{date_str}_{event}.mp4"
                         output_path = os.path.join(output_dir, output_name)
@@ -187,13 +102,15 @@ if __name__ == "__main__":
         os.makedirs(output_dir)
         
     if os.path.isdir(input_path):
-        # Check if it's a frames folder or a parent folder
-        if any(f.startswith("TLS_") for f in os.listdir(input_path)):
-            process_folder(input_path, output_dir)
-        else:
-            # Sort subfolders by name descending (most recent first)
-            subfolders = sorted([os.path.join(input_path, d) for d in os.listdir(input_path) 
-                                if os.path.isdir(os.path.join(input_path, d))], reverse=True)
-            for sub in subfolders:
-                process_folder(sub, output_dir)
+        # One exiftool process serves every folder
+        with ExifDaemon() as exif:
+            # Check if it's a frames folder or a parent folder
+            if any(f.startswith("TLS_") for f in os.listdir(input_path)):
+                process_folder(input_path, output_dir, exif)
+            else:
+                # Sort subfolders by name descending (most recent first)
+                subfolders = sorted([os.path.join(input_path, d) for d in os.listdir(input_path) 
+                                    if os.path.isdir(os.path.join(input_path, d))], reverse=True)
+                for sub in subfolders:
+                    process_folder(sub, output_dir, exif)
 
@@ -0,0 +1,96 @@
+import os
+import subprocess
+import json
+from multiprocessing.pool import ThreadPool
+from datetime import datetime
+from location import SF_TZ
+
+class ExifDaemon:
+    """Long-lived exiftool process (-stay_open) so Perl starts once per run instead of once per file."""
+    def __init__(self):
+        self.proc = subprocess.Popen(["exiftool", "-stay_open", "True", "-@", "-"], stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+
+    def query(self, paths):
+        """Returns the EXIF timestamp (or None) for each path, in order."""
+        results = []
+        for path in paths:
+            self.proc.stdin.write(f"-DateTimeOriginal\n-CreateDate\n-d\n%Y-%m-%d %H:%M:%S\n-s3\n{path}\n-execute\n")
+            self.proc.stdin.flush()
+            lines = []
+            while True:
+                line = self.proc.stdout.readline()
+                if not line or line.strip() == "{ready}": break
+                if line.strip(): lines.append(line.strip())
+            results.append(datetime.strptime(lines[0], "%Y-%m-%d %H:%M:%S") if lines else None)
+        return results
+
+    def close(self):
+        self.proc.stdin.write("-stay_open\nFalse\n")
+        self.proc.stdin.flush()
+        self.proc.wait()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _exif_run(paths):
+    """Reads EXIF timestamps for many files in one exiftool run; returns {path: timestamp}."""
+    cmd = ["exiftool", "-j", "-DateTimeOriginal", "-CreateDate", "-d", "%Y-%m-%d %H:%M:%S", "-@", "-"]
+    result = subprocess.run(cmd, input="\n".join(paths) + "\n", capture_output=True, text=True)
+    stamps = {}
+    for entry in json.loads(result.stdout or "[]"):
+        value = entry.get("DateTimeOriginal") or entry.get("CreateDate")
+        if value:
+            stamps[entry["SourceFile"]] = datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    return stamps
+
+def batch_exif(paths):
+    """Reads EXIF timestamps in bulk, split across one exiftool run per CPU; returns {path: timestamp}.
+    Timestamps are the camera's naive wall-clock times."""
+    workers = os.cpu_count() or 1
+    stamps = {}
+    with ThreadPool(workers) as pool:
+        for batch in pool.imap_unordered(_exif_run, [c for c in (paths[i::workers] for i in range(workers)) if c]):
+            stamps.update(batch)
+    return stamps
+
+def folder_times(jobs, min_interval=1, max_interval=600):
+    """Returns {folder: (t0, tn)}, the first and last capture times, for (folder, sorted_files) jobs.
+    File mtimes are used when the capture interval they imply looks like a real time-lapse and a spot
+    check against EXIF agrees; everything else has its first/last frame read by exiftool."""
+    times, probes = {}, []
+    for root, files in jobs:
+        first, last = os.path.join(root, files[0]), os.path.join(root, files[-1])
+        try:
+            # Read in the SF zone so the result is the same naive wall-clock time EXIF holds, on any host
+            t0 = datetime.fromtimestamp(int(os.stat(first).st_mtime), SF_TZ).replace(tzinfo=None)
+            tn = datetime.fromtimestamp(int(os.stat(last).st_mtime), SF_TZ).replace(tzinfo=None)
+        except OSError:
+            t0 = tn = None
+        if t0 and len(files) > 1 and min_interval <= (tn - t0).total_seconds() / (len(files) - 1) <= max_interval:
+            times[root] = (t0, tn)
+        else:
+            probes += [first, last]
+    # A uniform offset (card read in the wrong zone, files copied without their mtimes) passes the interval
+    # check, so the first and last fast-path folders are verified against EXIF in the same exiftool pass
+    fast = [(root, files) for root, files in jobs if root in times]
+    checked = fast[:1] + fast[1:][-1:]
+    spot = [os.path.join(root, files[i]) for root, files in checked for i in (0, -1)]
+    stamps = batch_exif(probes + spot) if probes or spot else {}
+    for root, files in checked:
+        t0, tn = times[root]
+        tolerance = max(2, (tn - t0).total_seconds() / (len(files) - 1))
+        exif0, exifn = stamps.get(os.path.join(root, files[0])), stamps.get(os.path.join(root, files[-1]))
+        if not exif0 or not exifn or abs((exif0 - t0).total_seconds()) > tolerance or abs((exifn - tn).total_seconds()) > tolerance:
+            print("File times don't match EXIF, reading EXIF for every folder...")
+            rest = [os.path.join(r, f[i]) for r, f in fast for i in (0, -1)]
+            stamps.update(batch_exif([p for p in rest if p not in stamps]))
+            times = {}
+            break
+    for root, files in jobs:
+        if root not in times:
+            times[root] = (stamps.get(os.path.join(root, files[0])), stamps.get(os.path.join(root, files[-1])))
+    return times
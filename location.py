@@ -0,0 +1,6 @@
+from zoneinfo import ZoneInfo
+
+# San Francisco Coordinates
+LATITUDE = 37.791667734079596
+LONGITUDE = -122.41549323195979
+SF_TZ = ZoneInfo("America/Los_Angeles")
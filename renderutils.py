@@ -0,0 +1,189 @@
+import os
+import sys
+import subprocess
+import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import functools
+from PIL import Image, ImageDraw, ImageFont
+try:
+    import pyvips
+except ImportError:
+    pyvips = None
+
+def _find_font_path():
+    """Returns the first usable system font, or None to fall back to PIL's default."""
+    for p in ["/Library/Fonts/Arial.ttf", "/System/Library/Fonts/Helvetica.ttc", "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"]:
+        if os.path.exists(p):
+            try: ImageFont.truetype(p, 40); return p
+            except: continue
+    return None
+
+# Resolved once at import (also in each pool worker) instead of on every encode
+_FONT_PATH = _find_font_path()
+
+@functools.lru_cache(maxsize=None)
+def _get_font(size):
+    """Loads the font once per process and size."""
+    return ImageFont.truetype(_FONT_PATH, size) if _FONT_PATH else None
+
+def _load_frame(path, size=None):
+    """Decodes a frame with Smart Orientation applied (landscape is rotated to vertical).
+    Uses libvips when pyvips is installed, otherwise PIL.
+    With size (the portrait output size), PIL's draft mode lets libjpeg decode oversized
+    frames at 1/2, 1/4 or 1/8 scale instead of decoding full resolution and resizing."""
+    if pyvips:
+        # rot90 needs the whole image, so the default (random) access mode is kept
+        v = pyvips.Image.new_from_file(path)
+        if v.width > v.height:
+            v = v.rot90()
+        if v.bands != 3:
+            v = v.colourspace("srgb")
+        return Image.frombytes("RGB", (v.width, v.height), v.write_to_memory())
+    img = Image.open(path)
+    if size:
+        # draft takes the size in source orientation and never goes below it
+        img.draft("RGB", (size[1], size[0]) if img.width > img.height else size)
+    if img.width > img.height:
+        img = img.transpose(Image.ROTATE_270)
+    return img
+
+def _readahead(path):
+    """Asks the kernel to start reading a frame into the page cache (Linux only, best effort)."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    finally:
+        os.close(fd)
+
+def _render_frame(args):
+    """Loads, orients and timestamps one frame; returns its raw RGB bytes."""
+    ts, path, size = args
+    font = _get_font(40)
+    img = _load_frame(path, size)
+    if img.mode != "RGB": img = img.convert("RGB")
+    if img.size != size: img = img.resize(size)
+    draw = ImageDraw.Draw(img)
+    ts_str = ts.strftime("%Y-%m-%d %H:%M:%S")
+    draw.text((img.width - 450, img.height - 80), ts_str, font=font, fill=(200, 200, 200, 150) if font else (200,200,200))
+    return img.tobytes()
+
+def _ass_time(cs):
+    """Formats centiseconds as an ASS timestamp (H:MM:SS.cc)."""
+    return f"{cs // 360000}:{cs // 6000 % 60:02d}:{cs // 100 % 60:02d}.{cs % 100:02d}"
+
+# Hardware H.264 encoders in order of preference; each is probed before it is trusted
+_HW_ENCODERS = [
+    ("darwin", ["-c:v", "h264_videotoolbox", "-b:v", "20M"]),
+    ("linux", ["-c:v", "h264_nvenc", "-preset", "p5", "-cq", "20", "-b:v", "0"]),
+]
+_X264_ARGS = ("-c:v", "libx264", "-crf", "18", "-pix_fmt", "yuv420p")
+
+@functools.lru_cache(maxsize=None)
+def _encoder_args(size):
+    """ffmpeg encoder arguments for a clip of the given size: VideoToolbox on macOS or NVENC on Linux
+    when a test encode at that size succeeds, else libx264."""
+    for platform, args in _HW_ENCODERS:
+        if not sys.platform.startswith(platform): continue
+        # The encoder can be compiled into ffmpeg without a usable device behind it, and has its own size limits
+        probe = ["ffmpeg", "-loglevel", "quiet", "-f", "lavfi", "-i", f"color=black:s={size[0]}x{size[1]}", "-frames:v", "1", *args, "-f", "null", "-"]
+        if subprocess.run(probe, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0:
+            return tuple(args + ["-pix_fmt", "yuv420p"])
+    return _X264_ARGS
+
+def _output_size(path):
+    """Portrait output size (after Smart Orientation) from a frame's header."""
+    with Image.open(path) as img:
+        return (img.height, img.width) if img.width > img.height else img.size
+
+def encode_concat(frame_list, output_path, tmp_dir, burn_in=False):
+    """Encodes the source JPEGs directly through ffmpeg's concat demuxer, no PIL involved.
+    Smart Orientation is done by the transpose filter (landscape frames are rotated clockwise).
+    With burn_in, the timestamps are drawn by ffmpeg's subtitles filter from a generated ASS track.
+    tmp_dir holds the concat list and subtitles and is removed afterwards."""
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    list_path = os.path.join(tmp_dir, "concat.txt")
+    with open(list_path, "w") as fh:
+        for ts, path in frame_list:
+            escaped = os.path.abspath(path).replace("'", "'\\''")
+            fh.write(f"file '{escaped}'\nduration {1 / 30:.6f}\n")
+    size = _output_size(frame_list[0][1])
+    vf = "transpose=dir=clock:passthrough=portrait"
+    if burn_in:
+        w, h = size
+        ass_path = os.path.join(tmp_dir, "stamps.ass")
+        with open(ass_path, "w") as fh:
+            # Same look as the PIL overlay: 40px light gray text, top-left anchored at (w - 450, h - 80)
+            fh.write(f"[Script Info]\nScriptType: v4.00+\nPlayResX: {w}\nPlayResY: {h}\n\n"
+                     "[V4+ Styles]\nFormat: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+                     "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+                     "Alignment, MarginL, MarginR, MarginV, Encoding\n"
+                     "Style: Stamp,Arial,40,&H00C8C8C8,&H00C8C8C8,&H00000000,&H00000000,0,0,0,0,100,100,0,0,1,0,0,7,0,0,0,1\n\n"
+                     "[Events]\nFormat: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n")
+            # One line per frame, switching halfway between frames so rounding can't show a neighbour's stamp
+            for i, (ts, path) in enumerate(frame_list):
+                start, end = _ass_time(max(0, (2 * i - 1) * 5 // 3)), _ass_time((2 * i + 1) * 5 // 3)
+                fh.write(f"Dialogue: 0,{start},{end},Stamp,,0,0,0,,{{\\pos({w - 450},{h - 80})}}{ts.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        vf += f",subtitles={ass_path}"
+    cmd = ["ffmpeg", "-loglevel", "quiet", "-y", "-f", "concat", "-safe", "0", "-i", list_path, "-vf", vf, "-r", "30"]
+    encoder = _encoder_args(size)
+    ok = subprocess.run([*cmd, *encoder, output_path]).returncode == 0
+    if not ok and encoder != _X264_ARGS:
+        # A probed hardware encoder can still fail on the real clip (busy sessions, driver limits)
+        print("Hardware encode failed, retrying with libx264...")
+        ok = subprocess.run([*cmd, *_X264_ARGS, output_path]).returncode == 0
+    if not ok:
+        print(f"Encoding failed: {output_path}")
+        if os.path.exists(output_path): os.remove(output_path)
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def _pipe_frames(frame_list, output_path, size, encoder):
+    """Streams the rendered frames through one ffmpeg run; returns True if it produced the clip."""
+    # Raw RGB frames are streamed straight into ffmpeg: no tmp JPEGs, no second encode/decode
+    proc = subprocess.Popen(["ffmpeg", "-loglevel", "quiet", "-y", "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{size[0]}x{size[1]}", "-framerate", "30", "-i", "-", *encoder, output_path], stdin=subprocess.PIPE)
+    # Frames render in worker processes; a bounded window of results keeps memory flat while ffmpeg consumes them in order
+    window = 2 * (os.cpu_count() or 1)
+    pending = deque()
+    rendered = False
+    try:
+        with ProcessPoolExecutor() as ex:
+            for i, (ts, path) in enumerate(frame_list):
+                # Frames a full window ahead are read from disk while the current ones decode
+                if i + window < len(frame_list):
+                    _readahead(frame_list[i + window][1])
+                pending.append(ex.submit(_render_frame, (ts, path, size)))
+                if len(pending) >= window:
+                    proc.stdin.write(pending.popleft().result())
+            while pending:
+                proc.stdin.write(pending.popleft().result())
+        rendered = True
+    except BrokenPipeError:
+        pass # ffmpeg exited early; reported through its return code below
+    finally:
+        # ffmpeg is always released, and a partial clip is removed so the next run doesn't skip the date
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        proc.wait()
+        if (not rendered or proc.returncode != 0) and os.path.exists(output_path):
+            os.remove(output_path)
+    return rendered and proc.returncode == 0
+
+def encode_frames(frame_list, output_path):
+    """Renders the timestamped frames with PIL (or libvips) and streams them to ffmpeg as raw RGB."""
+    size = _output_size(frame_list[0][1])
+    encoder = _encoder_args(size)
+    ok = _pipe_frames(frame_list, output_path, size, encoder)
+    if not ok and encoder != _X264_ARGS:
+        # A probed hardware encoder can still fail on the real clip (busy sessions, driver limits)
+        print("Hardware encode failed, retrying with libx264...")
+        ok = _pipe_frames(frame_list, output_path, size, _X264_ARGS)
+    if not ok:
+        print(f"Encoding failed: {output_path}")
@@ -0,0 +1,57 @@
+import math
+import functools
+from datetime import datetime, timedelta, timezone
+try:
+    import numpy as np
+except ImportError:
+    np = None
+from location import LATITUDE, LONGITUDE, SF_TZ
+
+def _solar_params(day_of_year, xp=math):
+    """Equation of time (minutes) and solar declination (radians) for a day of the year.
+    With xp=numpy it is vectorized over an array of days of the year."""
+    gamma = (2 * xp.pi / 365.0) * (day_of_year - 1)
+    eqtime = 229.18 * (0.000075 + 0.001868 * xp.cos(gamma) - 0.032077 * xp.sin(gamma) \
+             - 0.014615 * xp.cos(2 * gamma) - 0.040849 * xp.sin(2 * gamma))
+    decl = 0.006918 - 0.399912 * xp.cos(gamma) + 0.070257 * xp.sin(gamma) \
+           - 0.006758 * xp.cos(2 * gamma) + 0.000907 * xp.sin(2 * gamma) \
+           - 0.002697 * xp.cos(3 * gamma) + 0.00148 * xp.sin(3 * gamma)
+    return eqtime, decl
+
+# Both only depend on the day of year, so the whole table is filled once at import:
+# in one vectorized pass when numpy is installed, otherwise day by day (the lean scripts don't need numpy)
+if np:
+    _SOLAR_TABLE = list(zip(*(a.tolist() for a in _solar_params(np.arange(367), np))))
+else:
+    _SOLAR_TABLE = [_solar_params(d) for d in range(367)]
+_RAD_LAT = math.radians(LATITUDE)
+_COS_LAT = math.cos(_RAD_LAT)
+_TAN_LAT = math.tan(_RAD_LAT)
+# Sunrise/sunset zenith (90.833 deg, includes atmospheric refraction)
+_ZENITH_DEG = 90.833
+_ZENITH_RAD = math.radians(_ZENITH_DEG)
+_COS_ZENITH = math.cos(_ZENITH_RAD)
+
+@functools.lru_cache(maxsize=1024)
+def get_sun_time(date, event="sunset", zenith_deg=_ZENITH_DEG):
+    """Calculates when the sun crosses zenith_deg in SF (90.833 = sunrise/sunset, 96 = civil, 102 = nautical).
+    event picks the morning ("sunrise") or evening crossing. Returns an aware SF time, or None if the sun never gets there."""
+    eqtime, decl = _SOLAR_TABLE[date.timetuple().tm_yday]
+    cos_zenith = _COS_ZENITH if zenith_deg == _ZENITH_DEG else math.cos(math.radians(zenith_deg))
+    cos_ha = (cos_zenith / (_COS_LAT * math.cos(decl))) - (_TAN_LAT * math.tan(decl))
+    if cos_ha > 1 or cos_ha < -1: return None
+    ha_deg = math.degrees(math.acos(cos_ha))
+    solar_noon_utc = 720 - (4 * LONGITUDE) - eqtime
+    utctime = solar_noon_utc - (4 * ha_deg) if event == "sunrise" else solar_noon_utc + (4 * ha_deg)
+    dt_utc = datetime(date.year, date.month, date.day, tzinfo=timezone.utc) + timedelta(minutes=utctime)
+    return dt_utc.astimezone(SF_TZ)
+
+@functools.lru_cache(maxsize=1024)
+def get_sun_events(date):
+    """Sunrise, sunset and civil dawn/dusk for SF on a date."""
+    return {
+        "sunrise": get_sun_time(date, "sunrise"),
+        "sunset": get_sun_time(date, "sunset"),
+        "civil_dawn": get_sun_time(date, "sunrise", 96.0),
+        "civil_dusk": get_sun_time(date, "sunset", 96.0)
+    }
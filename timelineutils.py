@@ -0,0 +1,71 @@
+import os
+import numpy as np
+from location import SF_TZ
+from exifutils import folder_times
+
+def wall_clock(dt):
+    """SF wall-clock time of an aware datetime, in the timeline's datetime64 representation."""
+    return np.datetime64(dt.astimezone(SF_TZ).replace(tzinfo=None), "s")
+
+class GlobalTimeline:
+    """Every TLS_ frame under root_dir, sorted by capture time (naive SF wall-clock)."""
+    def __init__(self, root_dir, start_cutoff=None):
+        jobs = []
+        for root, dirs, files in os.walk(root_dir):
+            if "thumbnail" in root: continue
+            tls_files = sorted([f for f in files if f.startswith("TLS_") and f.endswith(".jpg")])
+            if tls_files: jobs.append((root, tls_files))
+        
+        # First and last capture time of every folder: file mtimes when plausible, otherwise EXIF in bulk
+        times = folder_times(jobs)
+        
+        # Timestamps are EXIF wall-clock times held in one datetime64 array, parallel to the paths
+        # An aware cutoff is converted to SF wall-clock time first (a naive one is taken as SF already)
+        if start_cutoff and start_cutoff.tzinfo: start_cutoff = start_cutoff.astimezone(SF_TZ).replace(tzinfo=None)
+        ts_chunks, paths = [], []
+        for root, tls_files in jobs:
+            t0, tn = times[root]
+            if not t0 or not tn: continue
+            if start_cutoff and t0 < start_cutoff: continue
+            
+            # Handle variable capture rate by interpolating between t0 and tn
+            count = len(tls_files)
+            interval = (tn - t0).total_seconds() / (count - 1) if count > 1 else 10
+            offsets = (np.arange(count) * interval).astype("timedelta64[s]")
+            ts_chunks.append(np.datetime64(t0, "s") + offsets)
+            paths.extend(os.path.join(root, f) for f in tls_files)
+        ts = np.concatenate(ts_chunks) if ts_chunks else np.empty(0, dtype="datetime64[s]")
+        order = np.argsort(ts, kind="stable")
+        self._ts = ts[order]
+        self._paths = [paths[i] for i in order]
+        print(f"Indexed {len(self._paths)} frames.")
+
+    def __len__(self):
+        return len(self._paths)
+
+    def span(self):
+        """Returns the first and last frame timestamps."""
+        return self._ts[0].item(), self._ts[-1].item()
+
+    def get_time_window(self, start_time, end_time):
+        """Returns all frames between start_time and end_time."""
+        lo = np.searchsorted(self._ts, wall_clock(start_time), side="left")
+        hi = np.searchsorted(self._ts, wall_clock(end_time), side="right")
+        return list(zip(self._ts[lo:hi].tolist(), self._paths[lo:hi]))
+
+    def get_range(self, target_time, duration_sec=60, center_ratio=0.5):
+        """Returns duration_sec of 30 fps frames around target_time, center_ratio of them before it."""
+        num_frames = duration_sec * 30 # 30 fps
+        frames_before = int(num_frames * center_ratio)
+        
+        # Search for first frame >= (target_time - some buffer)
+        idx = int(np.searchsorted(self._ts, wall_clock(target_time), side="left"))
+        
+        start_idx = max(0, idx - frames_before)
+        end_idx = start_idx + num_frames
+        
+        if end_idx > len(self._paths):
+            end_idx = len(self._paths)
+            start_idx = max(0, end_idx - num_frames)
+            
+        return list(zip(self._ts[start_idx:end_idx].tolist(), self._paths[start_idx:end_idx]))